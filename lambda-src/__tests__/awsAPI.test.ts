@@ -0,0 +1,77 @@
+import {GetSecretValueCommandOutput, SecretsManagerClient} from "@aws-sdk/client-secrets-manager";
+import {getSecretValue, getSecretValues} from "../ts-src/awsAPI";
+
+// The secret cache lives at module scope, so each test uses its own secret name
+// to stop the tests seeing each other's cached values.
+const sendMock = jest.spyOn(SecretsManagerClient.prototype, 'send') as unknown as jest.Mock<Promise<GetSecretValueCommandOutput>>;
+
+function secretResponse(): GetSecretValueCommandOutput {
+  return {
+    SecretString: JSON.stringify({key1: "value1", key2: "value2"}),
+    $metadata: {}
+  };
+}
+
+describe("test getSecretValues function", () => {
+  beforeEach(() => {
+    sendMock.mockReset();
+    sendMock.mockResolvedValue(secretResponse());
+  });
+
+  afterEach(() => {
+    jest.useRealTimers();
+  });
+
+  it("should return the values in the order of the keys", async () => {
+    expect(await getSecretValues("OrderSecret", ["key2", "key1"])).toEqual(["value2", "value1"]);
+    expect(sendMock).toHaveBeenCalledTimes(1);
+  });
+
+  it("should only call Secrets Manager once for concurrent calls", async () => {
+    const [first, second] = await Promise.all([
+      getSecretValues("ConcurrentSecret", ["key1"]),
+      getSecretValue("ConcurrentSecret", "key2")
+    ]);
+    expect(first).toEqual(["value1"]);
+    expect(second).toBe("value2");
+    expect(sendMock).toHaveBeenCalledTimes(1);
+  });
+
+  it("should use the cache for a second call within the TTL", async () => {
+    await getSecretValues("CachedSecret", ["key1"]);
+    expect(await getSecretValues("CachedSecret", ["key2"])).toEqual(["value2"]);
+    expect(sendMock).toHaveBeenCalledTimes(1);
+  });
+
+  it("should fetch the secret again after the TTL", async () => {
+    jest.useFakeTimers();
+    await getSecretValues("ExpiringSecret", ["key1"]);
+    jest.setSystemTime(Date.now() + 1000 * 60 * 5 + 1);
+    await getSecretValues("ExpiringSecret", ["key1"]);
+    expect(sendMock).toHaveBeenCalledTimes(2);
+  });
+
+  it("should retry a failed fetch on the next call", async () => {
+    sendMock.mockRejectedValueOnce(new Error("AccessDeniedException"));
+    await expect(getSecretValues("FailingSecret", ["key1"])).rejects.toThrow("AccessDeniedException");
+    expect(await getSecretValues("FailingSecret", ["key1"])).toEqual(["value1"]);
+    expect(sendMock).toHaveBeenCalledTimes(2);
+  });
+
+  it("should throw if a key is missing from the secret", async () => {
+    await expect(getSecretValues("MissingKeySecret", ["key3"])).rejects.toThrow("Secret key key3 not found");
+  });
+
+  it("should use env var overrides without calling Secrets Manager", async () => {
+    process.env.overriddenKey1 = "envValue1";
+    process.env.overriddenKey2 = "envValue2";
+    try {
+      expect(await getSecretValues("EnvSecret", ["overriddenKey1", "overriddenKey2"])).toEqual(["envValue1", "envValue2"]);
+      expect(sendMock).not.toHaveBeenCalled();
+    }
+    finally {
+      delete process.env.overriddenKey1;
+      delete process.env.overriddenKey2;
+    }
+  });
+});
@@ -0,0 +1,81 @@
+import {Auth, google} from "googleapis";
+import {Context} from "aws-lambda";
+import {handlePromptCommand} from "../ts-src/handlePromptCommand";
+import {getGCalToken} from "../ts-src/tokenStorage";
+import {getSecretValues} from "../ts-src/awsAPI";
+import {postEphmeralErrorMessage} from "../ts-src/slackAPI";
+
+jest.mock("../ts-src/tokenStorage");
+jest.mock("../ts-src/awsAPI");
+jest.mock("../ts-src/slackAPI");
+
+// Record the auth client used for each search so the tests can see whether it was reused.
+const searchAuths: Auth.OAuth2Client[] = [];
+const searchMock = jest.fn();
+jest.spyOn(google, 'discoveryengine').mockImplementation(((options: {auth: Auth.OAuth2Client}) => {
+  return {
+    projects: {locations: {collections: {dataStores: {servingConfigs: {
+      search: () => {
+        searchAuths.push(options.auth);
+        return searchMock() as unknown;
+      }
+    }}}}}
+  };
+}) as never);
+
+const context = {getRemainingTimeInMillis: () => 1000 * 30} as Context;
+
+function mockSecrets(gcpClientSecret = "clientSecret") {
+  jest.mocked(getSecretValues).mockResolvedValue(["clientId", gcpClientSecret, "https://aibot.example.com", "servingConfig", "https://rootUrl.example.com"]);
+}
+
+// The client cache is keyed on Slack user id and lives at module scope,
+// so each test uses its own user to stop the tests seeing each other's clients.
+async function prompt(user_id: string) {
+  await handlePromptCommand({user_id, channel: "C12345", text: "question"}, context);
+}
+
+describe("test handlePromptCommand OAuth2 client caching", () => {
+  beforeEach(() => {
+    searchAuths.length = 0;
+    searchMock.mockReset();
+    searchMock.mockResolvedValue({data: {}});
+    jest.mocked(getGCalToken).mockResolvedValue("refreshToken");
+    mockSecrets();
+  });
+
+  it("should reuse the client for the same refresh token and options", async () => {
+    await prompt("U1");
+    await prompt("U1");
+    expect(searchAuths).toHaveLength(2);
+    expect(searchAuths[1]).toBe(searchAuths[0]);
+  });
+
+  it("should rebuild the client if the refresh token changes", async () => {
+    await prompt("U2");
+    jest.mocked(getGCalToken).mockResolvedValue("newRefreshToken");
+    await prompt("U2");
+    expect(searchAuths[1]).not.toBe(searchAuths[0]);
+    expect(searchAuths[1].credentials.refresh_token).toBe("newRefreshToken");
+  });
+
+  it("should rebuild the client if the client secret changes", async () => {
+    await prompt("U3");
+    mockSecrets("rotatedClientSecret");
+    await prompt("U3");
+    expect(searchAuths[1]).not.toBe(searchAuths[0]);
+  });
+
+  it("should evict the client if the search fails and build a fresh one next time", async () => {
+    searchMock.mockRejectedValueOnce(new Error("invalid_client"));
+    await prompt("U4");
+    expect(postEphmeralErrorMessage).toHaveBeenCalled();
+
+    await prompt("U4");
+    expect(searchAuths[1]).not.toBe(searchAuths[0]);
+
+    // And the fresh client is cached again once it has worked.
+    await prompt("U4");
+    expect(searchAuths[2]).toBe(searchAuths[1]);
+  });
+});
@@ -0,0 +1,85 @@
+import {ErrorCode, WebClient} from "@slack/web-api";
+import axios, {AxiosError} from "axios";
+import {NO_RATE_LIMIT_RETRIES, postMessage, postToResponseUrl} from "../ts-src/slackAPI";
+
+const apiCallMock = jest.spyOn(WebClient.prototype, 'apiCall');
+
+function rateLimitedError(retryAfter: number) {
+  return Object.assign(new Error("A rate limit was exceeded"), {
+    code: ErrorCode.RateLimitedError,
+    retryAfter
+  });
+}
+
+describe("test postMessage rate limit handling", () => {
+  beforeAll(() => {
+    process.env.slackBotToken = "xoxb-test";
+  });
+
+  afterAll(() => {
+    delete process.env.slackBotToken;
+  });
+
+  beforeEach(() => {
+    jest.useFakeTimers();
+    apiCallMock.mockReset();
+    apiCallMock.mockResolvedValue({ok: true});
+  });
+
+  afterEach(() => {
+    jest.useRealTimers();
+  });
+
+  it("should retry after the Retry-After period if that's within the deadline", async () => {
+    apiCallMock.mockRejectedValueOnce(rateLimitedError(1));
+    const promise = postMessage("C12345", "text", [], undefined, Date.now() + 1000 * 5);
+    await jest.advanceTimersByTimeAsync(1000);
+    await promise;
+    expect(apiCallMock).toHaveBeenCalledTimes(2);
+  });
+
+  it("should not retry if the Retry-After period goes past the deadline", async () => {
+    apiCallMock.mockRejectedValueOnce(rateLimitedError(30));
+    await expect(postMessage("C12345", "text", [])).rejects.toMatchObject({code: ErrorCode.RateLimitedError});
+    expect(apiCallMock).toHaveBeenCalledTimes(1);
+  });
+
+  it("should not retry when asked for no rate limit retries", async () => {
+    apiCallMock.mockRejectedValueOnce(rateLimitedError(1));
+    await expect(postMessage("C12345", "text", [], undefined, NO_RATE_LIMIT_RETRIES)).rejects.toMatchObject({code: ErrorCode.RateLimitedError});
+    expect(apiCallMock).toHaveBeenCalledTimes(1);
+  });
+
+  it("should not retry other errors", async () => {
+    apiCallMock.mockRejectedValueOnce(new Error("channel_not_found"));
+    await expect(postMessage("C12345", "text", [])).rejects.toThrow("channel_not_found");
+    expect(apiCallMock).toHaveBeenCalledTimes(1);
+  });
+});
+
+describe("test postToResponseUrl connection handling", () => {
+  const requestMock = jest.spyOn(axios.Axios.prototype, 'request');
+
+  beforeEach(() => {
+    requestMock.mockReset();
+    requestMock.mockResolvedValue({status: 200});
+  });
+
+  it("should retry once if the pooled connection was reset", async () => {
+    requestMock.mockRejectedValueOnce(new AxiosError("socket hang up", "ECONNRESET"));
+    await postToResponseUrl("https://hooks.slack.com/test", "ephemeral", "text", []);
+    expect(requestMock).toHaveBeenCalledTimes(2);
+  });
+
+  it("should not retry more than once", async () => {
+    requestMock.mockRejectedValue(new AxiosError("socket hang up", "ECONNRESET"));
+    await expect(postToResponseUrl("https://hooks.slack.com/test", "ephemeral", "text", [])).rejects.toThrow("socket hang up");
+    expect(requestMock).toHaveBeenCalledTimes(2);
+  });
+
+  it("should not retry other errors", async () => {
+    requestMock.mockRejectedValueOnce(new AxiosError("timeout", "ECONNABORTED"));
+    await expect(postToResponseUrl("https://hooks.slack.com/test", "ephemeral", "text", [])).rejects.toThrow("timeout");
+    expect(requestMock).toHaveBeenCalledTimes(1);
+  });
+});
@@ -0,0 +1,62 @@
+import {DeleteItemCommand, DeleteItemCommandOutput, DynamoDBClient, PutItemCommand, PutItemCommandInput} from "@aws-sdk/client-dynamodb";
+import {State, deleteState, putState} from "../ts-src/stateTable";
+
+const sendMock = jest.spyOn(DynamoDBClient.prototype, 'send') as unknown as jest.Mock<Promise<unknown>, [PutItemCommand | DeleteItemCommand]>;
+
+// Save the state via putState and then feed the item it wrote back into deleteState.
+async function roundTrip(state: State) {
+  sendMock.mockResolvedValueOnce({$metadata: {}});
+  await putState(state.nonce, state);
+  const putItemCommandInput = sendMock.mock.calls[0][0].input as PutItemCommandInput;
+
+  const deleteItemCommandOutput: DeleteItemCommandOutput = {
+    Attributes: putItemCommandInput.Item,
+    $metadata: {}
+  };
+  sendMock.mockResolvedValueOnce(deleteItemCommandOutput);
+  return await deleteState(state.nonce);
+}
+
+describe("test stateTable functions", () => {
+  beforeEach(() => {
+    sendMock.mockReset();
+  });
+
+  it("should round trip state without a verifier", async () => {
+    const state: State = {
+      nonce: "nonce1",
+      slack_user_id: "U12345"
+    };
+    expect(await roundTrip(state)).toEqual(state);
+  });
+
+  it("should round trip state with a verifier", async () => {
+    const state: State = {
+      nonce: "nonce2",
+      slack_user_id: "U12345",
+      verifier: "verifier2"
+    };
+    expect(await roundTrip(state)).toEqual(state);
+  });
+
+  it("should return undefined if there was no state for the nonce", async () => {
+    sendMock.mockResolvedValueOnce({$metadata: {}});
+    expect(await deleteState("nonce3")).toBeUndefined();
+  });
+
+  it("should return undefined for state saved in the old JSON string format", async () => {
+    const state: State = {
+      nonce: "nonce4",
+      slack_user_id: "U12345"
+    };
+    const deleteItemCommandOutput: DeleteItemCommandOutput = {
+      Attributes: {
+        nonce: {S: state.nonce},
+        state: {S: JSON.stringify(state)}
+      },
+      $metadata: {}
+    };
+    sendMock.mockResolvedValueOnce(deleteItemCommandOutput);
+    expect(await deleteState(state.nonce)).toBeUndefined();
+  });
+});
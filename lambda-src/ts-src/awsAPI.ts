@@ -12,44 +12,104 @@ import {SecretsManagerClient, GetSecretValueCommand, SecretsManagerClientConfig,
  * @throws AccessDeniedException if the caller doesn't have access to that secret or Error if the secret or key don't exist
  */
 export async function getSecretValue(secretName: string, secretKey: string) {
+  const [secret] = await getSecretValues(secretName, [secretKey]);
+  return secret;
+}
+
+/**
+ * Get several values from the same secret in AWS Secrets Manager.
+ * Only calls Secrets Manager once, rather than once per key as calling getSecretValue repeatedly would.
+ * @param secretName Name of the secrets
+ * @param secretKeys Keys of the secret.  The secret is assumed to be stored as JSON text.
+ * @returns The secret values as strings, in the same order as secretKeys
+ * @throws AccessDeniedException if the caller doesn't have access to that secret or Error if the secret or any key doesn't exist
+ */
+export async function getSecretValues(secretName: string, secretKeys: string[]) {
+  // Only go to Secrets Manager if some of the keys aren't overridden by env vars.
+  // process.env is backed by native getters so read each key just once.
+  const envSecrets = secretKeys.map(secretKey => process.env[secretKey]);
+  let secrets: SecretValue | undefined;
+  if(envSecrets.some(envSecret => !envSecret)) {
+    secrets = await fetchSecret(secretName);
+  }
+
+  return secretKeys.map((secretKey, index) => {
+    const envSecret = envSecrets[index];
+    if(envSecret) {
+      return envSecret;
+    }
+    const secret = secrets?.[secretKey];
+    if(!secret) {
+      throw new Error(`Secret key ${secretKey} not found`);
+    }
+    return secret;
+  });
+}
+
+type SecretValue = {
+  [key: string]: string;
+};
+
+// Secrets keyed by secret name.  Lambda containers are reused between invocations
+// so this saves a call to Secrets Manager on every warm start.
+// Entries expire so that rotated secrets get picked up without a redeploy.
+// The promise is cached rather than the value, so concurrent callers asking for
+// the same secret share one in-flight request to Secrets Manager.
+const SECRET_CACHE_TTL_IN_MS = 1000 * 60 * 5; // 5 minutes
+type CachedSecret = {
+  secret: Promise<SecretValue>,
+  expiry: number
+};
+const secretCache = new Map<string, CachedSecret>();
 
-  const envSecret = process.env[secretKey];
-  if(envSecret) {
-    return envSecret;
+const secretsManagerClientConfig: SecretsManagerClientConfig = {
+  region: 'eu-west-2'
+};
+const secretsManagerClient = new SecretsManagerClient(secretsManagerClientConfig);
+
+async function fetchSecret(secretName: string) {
+  const cachedSecret = secretCache.get(secretName);
+  if(cachedSecret && cachedSecret.expiry > Date.now()) {
+    return cachedSecret.secret;
   }
 
-  const configuration: SecretsManagerClientConfig = {
-    region: 'eu-west-2'
+  const entry: CachedSecret = {
+    secret: requestSecret(secretName),
+    expiry: Date.now() + SECRET_CACHE_TTL_IN_MS
   };
-  
-  const client = new SecretsManagerClient(configuration);
+  secretCache.set(secretName, entry);
+  try {
+    return await entry.secret;
+  }
+  catch (error) {
+    // Don't cache failures, so the next caller tries again.
+    if(secretCache.get(secretName) === entry) {
+      secretCache.delete(secretName);
+    }
+    throw error;
+  }
+}
+
+async function requestSecret(secretName: string) {
   const input: GetSecretValueRequest = { // GetSecretValueRequest
     SecretId: secretName,
   };
   const command = new GetSecretValueCommand(input);
-  const response = await client.send(command);
+  const response = await secretsManagerClient.send(command);
 
   if(!response.SecretString) {
     throw new Error(`Secret ${secretName} not found`);
   }
 
-  type SecretValue = {
-    [key: string]: string;
- };
-  const secrets = JSON.parse(response.SecretString) as SecretValue;
-
-  const secret = secrets[secretKey];
-  if(!secret) {
-    throw new Error(`Secret key ${secretKey} not found`);
-  }
-  return secret;
+  return JSON.parse(response.SecretString) as SecretValue;
 }
 
+const lambdaClientConfig: LambdaClientConfig = {
+  region: 'eu-west-2'
+};
+const lambdaClient = new LambdaClient(lambdaClientConfig);
+
 export async function invokeLambda(functionName: string, payload: string) {
-  const configuration: LambdaClientConfig = {
-    region: 'eu-west-2'
-  };
-  const lambdaClient = new LambdaClient(configuration);
   const input: InvokeCommandInput = {
     FunctionName: functionName,
     InvocationType: InvocationType.Event,
@@ -2,7 +2,7 @@ import * as util from 'util';
 import {APIGatewayProxyEvent, APIGatewayProxyResult} from "aws-lambda";
 import {getSecretValue, invokeLambda} from './awsAPI';
 import {verifySlackRequest} from './verifySlackRequest';
-import {PromptCommandPayload, getBotId, postEphemeralMessage} from './slackAPI';
+import {NO_RATE_LIMIT_RETRIES, PromptCommandPayload, getBotId, postEphemeralMessage} from './slackAPI';
 import {AppHomeOpenedEvent, EnvelopedEvent, GenericMessageEvent} from '@slack/bolt';
 import {generateImmediateSlackResponseBlocks} from './generateImmediateSlackResponseBlocks';
 
@@ -26,6 +26,18 @@ export async function handleEventsEndpoint(event: APIGatewayProxyEvent): Promise
       statusCode: 200
     };
 
+    // Slack redelivers an event if we don't ack it within 3 seconds, eg if posting the
+    // "Thinking..." message is slow.  We will already have invoked the prompt lambda for
+    // the original delivery, so handling the retry would answer the same prompt twice.
+    // See https://api.slack.com/apis/connections/events-api#retries
+    if(event.headers['X-Slack-Retry-Num']) {
+      console.debug(`Ignoring redelivered event, retry ${event.headers['X-Slack-Retry-Num']}`);
+      return result;
+    }
+
+    // Parse the body once and view it as whichever type of payload it turns out to be.
+    const parsedBody: unknown = JSON.parse(event.body);
+
     // This handles the initial event API verification.
     // See https://api.slack.com/events/url_verification
     type URLVerification = {
@@ -33,7 +45,7 @@ export async function handleEventsEndpoint(event: APIGatewayProxyEvent): Promise
       challenge: string;
       type: string;
     };
-    const urlVerification = JSON.parse(event.body) as URLVerification;
+    const urlVerification = parsedBody as URLVerification;
     if(urlVerification.type === "url_verification") {
       result.body = JSON.stringify({
         challenge: urlVerification.challenge
@@ -45,7 +57,7 @@ export async function handleEventsEndpoint(event: APIGatewayProxyEvent): Promise
     }
 
     // Maybe we're getting a DM from the Messages tab
-    const envelopedEvent = JSON.parse(event.body) as EnvelopedEvent;
+    const envelopedEvent = parsedBody as EnvelopedEvent;
     if(envelopedEvent.event.type === "message") {
       const genericMessageEvent = envelopedEvent.event as GenericMessageEvent;
       // Get our own user ID and ignore messages we have posted, otherwise we'll get into an infinite loop.
@@ -58,20 +70,25 @@ export async function handleEventsEndpoint(event: APIGatewayProxyEvent): Promise
         return result;
       }
 
-      // We need to respond within 3000ms so post an ephemeral message and then
-      // call the AIBot-handlePromptCommandLambda asynchronously.
-      const blocks = generateImmediateSlackResponseBlocks();
-      await postEphemeralMessage(genericMessageEvent.channel, genericMessageEvent.user, "Thinking...", blocks);
-
-      if(!genericMessageEvent.text) {
-        throw new Error("No text in message");
+      // Don't bother the AI with empty messages, eg ones which are just a file upload.
+      if(!genericMessageEvent.text?.trim()) {
+        console.debug("Ignoring message with no text");
+        return result;
       }
       const promptCommandPayload: PromptCommandPayload = {
         text: genericMessageEvent.text, // Can be null in GenericMessageEvent but we have checked above.
         user_id: genericMessageEvent.user,  // Slack seems a bit inconsistent with user vs user_id
         ...genericMessageEvent
       };
-      await invokeLambda("AIBot-handlePromptCommandLambda", JSON.stringify(promptCommandPayload));
+
+      // We need to respond within 3000ms so post an ephemeral message and
+      // call the AIBot-handlePromptCommandLambda asynchronously.
+      // Neither depends on the other so do them both at once.
+      const blocks = generateImmediateSlackResponseBlocks();
+      await Promise.all([
+        postEphemeralMessage(genericMessageEvent.channel, genericMessageEvent.user, "Thinking...", blocks, NO_RATE_LIMIT_RETRIES),
+        invokeLambda("AIBot-handlePromptCommandLambda", JSON.stringify(promptCommandPayload))
+      ]);
     }
     // Else the user has opened the Home tab
     else if(envelopedEvent.event.type === "app_home_opened") {
@@ -2,8 +2,8 @@ import {APIGatewayProxyEvent, APIGatewayProxyResult} from 'aws-lambda';
 import {generateLoggedInHTML} from './generateLoggedInHTML';
 import {Auth} from 'googleapis';
 import {saveGCalToken} from './tokenStorage';
-import {getSecretValue, invokeLambda} from './awsAPI';
-import {deleteState, getState} from './stateTable';
+import {getSecretValues, invokeLambda} from './awsAPI';
+import {deleteState} from './stateTable';
 import {AppHomeOpenedEvent} from '@slack/bolt';
 
 export async function handleGoogleAuthRedirect(event: APIGatewayProxyEvent): Promise<APIGatewayProxyResult> {
@@ -17,15 +17,16 @@ export async function handleGoogleAuthRedirect(event: APIGatewayProxyEvent): Pro
       throw new Error("Missing event queryStringParameters");
     }
     const nonce = queryStringParameters.state;
-    const state = await getState(nonce);
+    // Deleting returns the old state, so this checks and consumes the nonce in one go.
+    // Fetch the secrets at the same time as they don't depend on the state.
+    const [state, [gcpClientId, gcpClientSecret, aiBotUrl]] = await Promise.all([
+      deleteState(nonce),
+      getSecretValues('AIBot', ['gcpClientId', 'gcpClientSecret', 'aiBotUrl'])
+    ]);
     if(!state) {
       throw new Error("Missing state.  Are you a cyber criminal trying a CSRF replay attack?");
     }
-    await deleteState(nonce);
 
-    const gcpClientId = await getSecretValue('AIBot', 'gcpClientId');
-    const gcpClientSecret = await getSecretValue('AIBot', 'gcpClientSecret');
-    const aiBotUrl = await getSecretValue('AIBot', 'aiBotUrl');
     const redirectUri = `${aiBotUrl}/google-oauth-redirect`;
 
     const options: Auth.OAuth2ClientOptions = {
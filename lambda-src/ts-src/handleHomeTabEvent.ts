@@ -1,7 +1,7 @@
 import {AppHomeOpenedEvent, KnownBlock} from '@slack/bolt';
 import {getGCalToken} from './tokenStorage';
 import {publishHomeView} from './slackAPI';
-import {getSecretValue} from './awsAPI';
+import {getSecretValues} from './awsAPI';
 import {Auth} from 'googleapis';
 import {generateGoogleAuthBlocks, generateGoogleLogoutBlocks} from './generateGoogleAuthBlocks';
 
@@ -13,9 +13,7 @@ export async function handleHomeTabEvent(event: AppHomeOpenedEvent) {
     blocks = generateGoogleLogoutBlocks("HomeTab");
   }
   else {
-    const gcpClientId = await getSecretValue('AIBot', 'gcpClientId');
-    const gcpClientSecret = await getSecretValue('AIBot', 'gcpClientSecret');
-    const aiBotUrl = await getSecretValue('AIBot', 'aiBotUrl');
+    const [gcpClientId, gcpClientSecret, aiBotUrl] = await getSecretValues('AIBot', ['gcpClientId', 'gcpClientSecret', 'aiBotUrl']);
     const gcpRedirectUri = `${aiBotUrl}/google-oauth-redirect`;
 
     const oAuth2ClientOptions: Auth.OAuth2ClientOptions = {
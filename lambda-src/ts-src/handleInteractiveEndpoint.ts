@@ -1,11 +1,10 @@
 import * as util from 'util';
 import {APIGatewayProxyEvent, APIGatewayProxyResult} from "aws-lambda";
 import {verifySlackRequest} from './verifySlackRequest';
-import axios from 'axios';
 import {getSecretValue, invokeLambda} from './awsAPI';
 import {AppHomeOpenedEvent, BlockAction, KnownBlock, SectionBlock, SlashCommand} from '@slack/bolt';
 import {handleLogoutCommand} from './handleLogoutCommand';
-import {publishHomeView} from './slackAPI';
+import {NO_RATE_LIMIT_RETRIES, deleteOriginalMessage, publishHomeView} from './slackAPI';
 
 /**
  * Handle the interaction posts from Slack.
@@ -32,9 +31,8 @@ export async function handleInteractiveEndpoint(event: APIGatewayProxyEvent): Pr
     if(payload.actions[0].action_id === "googleSignInButtonSlashCommand") {
       // If this is from the slash command then delete the original login card
       // as it can't be used again without appearing like a CSRF replay attack.
-      // Use the POST api as per https://api.slack.com/interactivity/handling#deleting_message_response
       // chat.delete doesn't seem to work here.
-      await axios.post(payload.response_url, {delete_original: "true"});
+      await deleteOriginalMessage(payload.response_url);
     }
     else if(payload.actions[0].action_id === "googleSignInButtonHomeTab") {
       // The handleGoogleAuthRedirect lambda does almost everything, but we need to remove
@@ -50,7 +48,7 @@ export async function handleInteractiveEndpoint(event: APIGatewayProxyEvent): Pr
         ]
       };
       blocks.push(sectionBlock);
-      await publishHomeView(payload.user.id, blocks);
+      await publishHomeView(payload.user.id, blocks, NO_RATE_LIMIT_RETRIES);
     }
     else if(payload.actions[0].action_id === "googleSignOutButtonHomeTab") {
       // Remove the button so the user can't click it twice.
@@ -65,7 +63,7 @@ export async function handleInteractiveEndpoint(event: APIGatewayProxyEvent): Pr
         ]
       };
       blocks.push(sectionBlock);
-      await publishHomeView(payload.user.id, blocks);
+      await publishHomeView(payload.user.id, blocks, NO_RATE_LIMIT_RETRIES);
       // Invoke the handleLogoutCommandLambda to do the logout.
       // It will in turn invoke the handleHomeTabEvent when it's done.
       const slashCommand: SlashCommand = {
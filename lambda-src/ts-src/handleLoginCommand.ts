@@ -1,6 +1,6 @@
 import {generateGoogleAuthBlocks} from './generateGoogleAuthBlocks';
 import {Auth} from 'googleapis';
-import {getSecretValue} from './awsAPI';
+import {getSecretValues} from './awsAPI';
 import {postErrorMessageToResponseUrl, postToResponseUrl} from './slackAPI';
 import {SlashCommand} from '@slack/bolt';
 
@@ -11,9 +11,7 @@ import {SlashCommand} from '@slack/bolt';
 export async function handleLoginCommand(event: SlashCommand): Promise<void> {
   const responseUrl = event.response_url;
   try {
-    const gcpClientId = await getSecretValue('AIBot', 'gcpClientId');
-    const gcpClientSecret = await getSecretValue('AIBot', 'gcpClientSecret');
-    const aiBotUrl = await getSecretValue('AIBot', 'aiBotUrl');
+    const [gcpClientId, gcpClientSecret, aiBotUrl] = await getSecretValues('AIBot', ['gcpClientId', 'gcpClientSecret', 'aiBotUrl']);
     const gcpRedirectUri = `${aiBotUrl}/google-oauth-redirect`;
 
     const oAuth2ClientOptions: Auth.OAuth2ClientOptions = {
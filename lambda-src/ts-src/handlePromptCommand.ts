@@ -1,44 +1,80 @@
 import {Auth, discoveryengine_v1alpha, google} from 'googleapis';
 import {getGCalToken} from './tokenStorage';
-import {getSecretValue} from './awsAPI';
+import {getSecretValues} from './awsAPI';
 import {postMessage, postEphmeralErrorMessage, postErrorMessageToResponseUrl, postToResponseUrl, PromptCommandPayload} from './slackAPI';
 import {KnownBlock, SectionBlock} from '@slack/bolt';
+import {Context} from 'aws-lambda';
 
-export async function handlePromptCommand(event: PromptCommandPayload): Promise<void> {
+// Matches both <b> and </b> so the snippet only needs to be scanned once.
+const boldTagRegExp = /<\/?b>/g;
+
+// OAuth2 clients keyed by Slack user id.  The client holds the access token it got by
+// exchanging the refresh token, and refreshes it itself when it expires, so reusing it
+// across warm invocations saves a call to Google's token endpoint on every prompt.
+// The options each client was built with are kept alongside it so that a rotated
+// client id/secret or changed redirect URI causes the client to be rebuilt.
+type CachedOAuth2Client = {
+  oauth2Client: Auth.OAuth2Client,
+  refreshToken: string,
+  oAuth2ClientOptions: Auth.OAuth2ClientOptions
+};
+const oauth2Clients = new Map<string, CachedOAuth2Client>();
+
+function getOAuth2Client(slackUserId: string, refreshToken: string, oAuth2ClientOptions: Auth.OAuth2ClientOptions) {
+  const cached = oauth2Clients.get(slackUserId);
+  // If the user has logged out and in again since we cached the client the refresh token will have changed.
+  if(cached &&
+    cached.refreshToken === refreshToken &&
+    cached.oAuth2ClientOptions.clientId === oAuth2ClientOptions.clientId &&
+    cached.oAuth2ClientOptions.clientSecret === oAuth2ClientOptions.clientSecret &&
+    cached.oAuth2ClientOptions.redirectUri === oAuth2ClientOptions.redirectUri) {
+    return cached.oauth2Client;
+  }
+
+  const oauth2Client = new Auth.OAuth2Client(oAuth2ClientOptions);
+  oauth2Client.setCredentials({
+    refresh_token: refreshToken
+  });
+  oauth2Clients.set(slackUserId, {oauth2Client, refreshToken, oAuth2ClientOptions});
+  return oauth2Client;
+}
+
+// Time to leave at the end of the lambda's run for reporting an error to the user.
+const ERROR_REPORTING_MARGIN_MS = 1000 * 5; // 5 seconds
+
+export async function handlePromptCommand(event: PromptCommandPayload, context: Context): Promise<void> {
   const responseUrl = event.response_url;
   const channelId = event.channel;
+  // We're invoked asynchronously so don't need to ack Slack quickly.  If Slack rate limits
+  // us then wait out the Retry-After, as long as that still leaves time before the lambda times out.
+  const rateLimitDeadline = Date.now() + context.getRemainingTimeInMillis() - ERROR_REPORTING_MARGIN_MS;
   try {
-    const gcalRefreshToken = await getGCalToken(event.user_id);
+    // The token lookup and the secret fetch are independent so do them concurrently.
+    // servingConfig is something like projects/<projectid>/locations/<region>/collections/default_collection/dataStores/<datastore>/servingConfigs/default_search
+    // rootUrl is something like https://eu-discoveryengine.googleapis.com/v1alpha - ie contains the region
+    const [gcalRefreshToken, [gcpClientId, gcpClientSecret, aiBotUrl, servingConfig, rootUrl]] = await Promise.all([
+      getGCalToken(event.user_id),
+      getSecretValues('AIBot', ['gcpClientId', 'gcpClientSecret', 'aiBotUrl', 'servingConfig', 'rootUrl'])
+    ]);
     if(!gcalRefreshToken) {
       if(responseUrl) {
         await postErrorMessageToResponseUrl(responseUrl, `Log into Google, either with the slash command or the bot's Home tab.`);
       }
       else if(channelId) {
-        await postEphmeralErrorMessage(channelId, event.user_id, `Log into Google, either with the slash command or the bot's Home tab.`);
+        await postEphmeralErrorMessage(channelId, event.user_id, `Log into Google, either with the slash command or the bot's Home tab.`, rateLimitDeadline);
       }
       return;
     }
 
     // User is logged into both Google so now we can use those APIs to call Vertex AI.
-    const gcpClientId = await getSecretValue('AIBot', 'gcpClientId');
-    const gcpClientSecret = await getSecretValue('AIBot', 'gcpClientSecret');
-    const aiBotUrl = await getSecretValue('AIBot', 'aiBotUrl');
     const gcpRedirectUri = `${aiBotUrl}/google-oauth-redirect`;
-    // Something like projects/<projectid>/locations/<region>/collections/default_collection/dataStores/<datastore>/servingConfigs/default_search
-    const servingConfig = await getSecretValue('AIBot', 'servingConfig');
-    // Something like https://eu-discoveryengine.googleapis.com/v1alpha - ie contains the region
-    const rootUrl = await getSecretValue('AIBot', 'rootUrl');
 
     const oAuth2ClientOptions: Auth.OAuth2ClientOptions = {
       clientId: gcpClientId,
       clientSecret: gcpClientSecret,
       redirectUri: gcpRedirectUri
     };
-    const oauth2Client = new Auth.OAuth2Client(oAuth2ClientOptions);
-  
-    oauth2Client.setCredentials({
-      refresh_token: gcalRefreshToken
-    });
+    const oauth2Client = getOAuth2Client(event.user_id, gcalRefreshToken, oAuth2ClientOptions);
     const options: discoveryengine_v1alpha.Options = {
       version: 'v1alpha',
       auth: oauth2Client,
@@ -73,7 +109,13 @@ export async function handlePromptCommand(event: PromptCommandPayload): Promise<
       requestBody
     };
     
-    const searchResults = await discoveryengine.projects.locations.collections.dataStores.servingConfigs.search(params);
+    const searchResults = await discoveryengine.projects.locations.collections.dataStores.servingConfigs.search(params)
+      .catch((error: unknown) => {
+        // Don't keep a client that may be unable to refresh its token, eg after a failed refresh.
+        // The next prompt will build a fresh one.
+        oauth2Clients.delete(event.user_id);
+        throw error;
+      });
 
     // Create some Slack blocks to display the results in a reasonable format
     const blocks: KnownBlock[] = [];
@@ -104,21 +146,23 @@ export async function handlePromptCommand(event: PromptCommandPayload): Promise<
       blocks.push(sectionBlock);
     }
     else {
+      type Snippet = {
+        snippet: string,
+        snippet_status: "SUCCESS" | "NO_SNIPPET_AVAILABLE"
+      };
       for(const result of searchResults.data.results) {
-        if(result.document?.derivedStructData) {
-          type Snippet = {
-            snippet: string,
-            snippet_status: "SUCCESS" | "NO_SNIPPET_AVAILABLE"
-          };
-          const snippets = result.document?.derivedStructData["snippets"] as Snippet[];
-          let link = result.document?.derivedStructData["link"] as string;
+        // Walk the optional chain once per result rather than once per field.
+        const derivedStructData = result.document?.derivedStructData;
+        if(derivedStructData) {
+          const snippets = derivedStructData["snippets"] as Snippet[];
+          let link = derivedStructData["link"] as string;
           // The link is in form gs://datastore/documentname, eg gs://searchtest1-docs/Atom Bank JIRA AE-1 - AE-1175.pdf
           // We can turn that into a real link by changing the scheme and prepending the GCP storage domain.
           link = link.replace("gs://", "https://storage.cloud.google.com/");
-          const title = result.document?.derivedStructData["title"] as string;
+          const title = derivedStructData["title"] as string;
           // There only seems to be one snippet every time so just take the first.
           // They have <b></b> HTML bold tags in, so replace that with mrkdown * for bold.
-          const snippet = snippets[0].snippet.replaceAll("<b>", "*").replaceAll("</b>", "*");
+          const snippet = snippets[0].snippet.replace(boldTagRegExp, "*");
           const text = `<${link}|${title}>\n${snippet}`;
           const sectionBlock: SectionBlock = {
             type: "section",
@@ -140,7 +184,7 @@ export async function handlePromptCommand(event: PromptCommandPayload): Promise<
     else if(channelId) {
       // If we're replying in a channel, whether that be the DM with the bot or in a normal channel,
       // reply in a thread.
-      await postMessage(channelId, `Search results`, blocks, event.event_ts);
+      await postMessage(channelId, `Search results`, blocks, event.event_ts, rateLimitDeadline);
     }
   }
   catch (error) {
@@ -149,7 +193,7 @@ export async function handlePromptCommand(event: PromptCommandPayload): Promise<
       await postErrorMessageToResponseUrl(responseUrl, "Failed to call AI API");
     }
     else if(channelId) {
-      await postEphmeralErrorMessage(channelId, event.user_id, "Failed to call AI API");
+      await postEphmeralErrorMessage(channelId, event.user_id, "Failed to call AI API", rateLimitDeadline);
     }
   }
 }
\ No newline at end of file
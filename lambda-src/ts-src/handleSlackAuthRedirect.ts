@@ -1,6 +1,6 @@
 import {APIGatewayProxyEvent, APIGatewayProxyResult} from "aws-lambda";
 import axios, {AxiosRequestConfig} from "axios";
-import {getSecretValue} from "./awsAPI";
+import {getSecretValues} from "./awsAPI";
 import querystring from 'querystring';
 
 export async function handleSlackAuthRedirect(event: APIGatewayProxyEvent): Promise<APIGatewayProxyResult> {
@@ -10,8 +10,7 @@ export async function handleSlackAuthRedirect(event: APIGatewayProxyEvent): Prom
       state: string // TODO use this to prevent CSRF attacks
     };
 
-    const slackClientId = await getSecretValue('AIBot', 'slackClientId');
-    const slackClientSecret = await getSecretValue('AIBot', 'slackClientSecret');
+    const [slackClientId, slackClientSecret] = await getSecretValues('AIBot', ['slackClientId', 'slackClientSecret']);
 
     const queryStringParameters: QueryStringParameters = event.queryStringParameters as QueryStringParameters;
     if(!event.queryStringParameters) {
@@ -1,9 +1,8 @@
-import {InvocationType, InvokeCommand, InvokeCommandInput, LambdaClient, LambdaClientConfig} from "@aws-sdk/client-lambda";
 import {generateImmediateSlackResponseBlocks} from './generateImmediateSlackResponseBlocks';
 import querystring from 'querystring';
 import {APIGatewayProxyEvent, APIGatewayProxyResult} from "aws-lambda";
 import {verifySlackRequest} from "./verifySlackRequest";
-import {getSecretValue} from "./awsAPI";
+import {getSecretValue, invokeLambda} from "./awsAPI";
 import {PromptCommandPayload} from "./slackAPI";
 import {getGCalToken} from "./tokenStorage";
 import {SlashCommand} from "@slack/bolt";
@@ -37,7 +36,7 @@ export async function handleSlashCommand(event: APIGatewayProxyEvent): Promise<A
 
     // Dispatch to the appropriate lambda depending on args passed to the Slash command
     // and whether we are logged into and Google
-    const slashCommandOptions = body.text.length == 0 ? "" : body.text;
+    const slashCommandOptions = body.text.trim();
     let functionName = "AIBot-handlePromptCommandLambda";
     const gcalRefreshToken = await getGCalToken(body.user_id);
     let payload: PromptCommandPayload | SlashCommand;
@@ -50,6 +49,10 @@ export async function handleSlashCommand(event: APIGatewayProxyEvent): Promise<A
       functionName = "AIBot-handleLogoutCommandLambda";
       payload = body;
     }
+    else if(slashCommandOptions.length == 0) {
+      // Nothing to ask the AI, so save invoking the prompt lambda.
+      return createErrorResult("Please enter a prompt after the command.");
+    }
     else {
       const promptCommandPayload: PromptCommandPayload = {
         ...body
@@ -57,23 +60,7 @@ export async function handleSlashCommand(event: APIGatewayProxyEvent): Promise<A
       payload = promptCommandPayload;
     }
 
-    const configuration: LambdaClientConfig = {
-      region: 'eu-west-2'
-    };
-
-    const lambdaClient = new LambdaClient(configuration);
-    const input: InvokeCommandInput = {
-      FunctionName: functionName,
-      InvocationType: InvocationType.Event,
-      Payload: new TextEncoder().encode(JSON.stringify(payload))
-    };
-
-    const invokeCommand = new InvokeCommand(input);
-    const output = await lambdaClient.send(invokeCommand);
-    if(output.StatusCode != 202) {
-      console.error(`Failed to invoke ${functionName}`);
-      throw new Error(output.FunctionError);
-    }
+    await invokeLambda(functionName, JSON.stringify(payload));
 
     return result;
   }
@@ -1,23 +1,124 @@
-import {WebClient, LogLevel, ViewsPublishArguments} from "@slack/web-api";
+import {WebClient, LogLevel, ViewsPublishArguments, RetryOptions, CodedError, ErrorCode, WebAPIRateLimitedError} from "@slack/web-api";
 import {getSecretValue} from './awsAPI';
 import {Block, HomeView, KnownBlock} from "@slack/bolt";
 import axios from 'axios';
+import {Agent} from 'https';
+
+// Node 18's global https agent doesn't keep connections alive, so share a keep-alive agent
+// between WebClient and axios.  Calls to Slack within an invocation, and across warm
+// invocations, can then reuse the TLS connection rather than doing a new handshake each time.
+const keepAliveAgent = new Agent({keepAlive: true});
+
+// Used for posts to Slack's response URLs.
+const axiosClient = axios.create({
+  httpsAgent: keepAliveAgent
+});
+
+/**
+ * Post to a Slack response URL.
+ * Each invocation usually only posts once, so the pooled connection is typically one left over
+ * from a previous invocation.  Slack may have closed it while the lambda was frozen, so if the
+ * post fails with the connection reset, try once more on a fresh connection.
+ * @param url the response URL
+ * @param body body to post as JSON
+ * @returns the axios response
+ */
+async function postToSlackUrl(url: string, body: unknown) {
+  try {
+    return await axiosClient.post(url, body);
+  }
+  catch (error) {
+    if(!axios.isAxiosError(error) || error.response || (error.code !== "ECONNRESET" && error.code !== "EPIPE")) {
+      throw error;
+    }
+    console.warn(`Connection to Slack closed (${error.code}), retrying`);
+    return await axiosClient.post(url, body);
+  }
+}
+
+// WebClient's default retry policy keeps going for about 30 minutes, but our lambdas
+// time out after 30 seconds.  So retry transient failures (eg 5xx or network errors)
+// with a short exponential backoff.
+// Rate limited calls (429) are handled separately: WebClient would sleep for the whole
+// Retry-After before each retry however long that is, so it rejects them instead
+// (see rejectRateLimitedCalls below) and callWithRateLimitRetries decides whether
+// there is time left to wait out the Retry-After.
+const retryConfig: RetryOptions = {
+  retries: 3,
+  factor: 2,
+  minTimeout: 500,
+  maxTimeout: 4000,
+  randomize: true
+};
+
+// Pass as rateLimitDeadline on paths which must ack Slack within 3 seconds,
+// so that a rate limited call fails straight away rather than waiting out Retry-After.
+export const NO_RATE_LIMIT_RETRIES = 0;
+// How long to keep retrying rate limited calls if the caller doesn't give a deadline.
+const DEFAULT_RATE_LIMIT_BUDGET_MS = 1000 * 10; // 10 seconds
+
+/**
+ * Make a Slack API call, retrying after the Retry-After period if Slack rate limits it.
+ * @param call the Slack API call
+ * @param rateLimitDeadline Time (ms since epoch) by which any retry must have started.
+ * If waiting out the Retry-After would go past this then the rate limit error is thrown.
+ * @returns the result of the call
+ */
+async function callWithRateLimitRetries<T>(call: () => Promise<T>, rateLimitDeadline: number): Promise<T> {
+  for(;;) {
+    try {
+      return await call();
+    }
+    catch (error) {
+      if((error as CodedError).code !== ErrorCode.RateLimitedError) {
+        throw error;
+      }
+      const retryAfterMs = (error as WebAPIRateLimitedError).retryAfter * 1000;
+      if(Date.now() + retryAfterMs > rateLimitDeadline) {
+        throw error;
+      }
+      console.warn(`Rate limited by Slack, retrying in ${retryAfterMs}ms`);
+      await new Promise(resolve => setTimeout(resolve, retryAfterMs));
+    }
+  }
+}
+
+// One WebClient per Lambda container.
+// The token is looked up on every call (it's cached by getSecretValue so that's cheap)
+// and the client rebuilt if it has changed, so a rotated bot token gets picked up.
+let webClient: WebClient | undefined;
+let webClientToken: string | undefined;
 
 async function createClient() {
   const slackBotToken = await getSecretValue('AIBot', 'slackBotToken');
-
-  return new WebClient(slackBotToken, {
-    logLevel: LogLevel.INFO
-  });
+  if(!webClient || webClientToken !== slackBotToken) {
+    webClientToken = slackBotToken;
+    webClient = new WebClient(slackBotToken, {
+      logLevel: LogLevel.INFO,
+      // A pooled socket may have been closed by Slack while the lambda was frozen.
+      // The resulting network error is retried by retryConfig on a fresh connection.
+      agent: keepAliveAgent,
+      retryConfig,
+      rejectRateLimitedCalls: true
+    });
+  }
+  return webClient;
 }
 
+// The bot's id never changes so only ask Slack for it once per Lambda container.
+// This is only called on the events endpoint's ack path so rate limiting isn't retried.
+let botId: string | undefined;
+
 export async function getBotId() {
-  const client = await createClient();
-  const result = await client.auth.test();
-  return result.bot_id;
+  if(!botId) {
+    const client = await createClient();
+    const result = await client.auth.test();
+    botId = result.bot_id;
+  }
+  return botId;
 }
 
-export async function publishHomeView(user: string, blocks: (KnownBlock | Block)[]) {
+export async function publishHomeView(user: string, blocks: (KnownBlock | Block)[], rateLimitDeadline = Date.now() + DEFAULT_RATE_LIMIT_BUDGET_MS) {
   const client = await createClient();
   const homeView: HomeView = {
     type: "home",
@@ -27,30 +128,30 @@ export async function publishHomeView(user: string, blocks: (KnownBlock | Block)
     user_id: user,
     view: homeView
   };
-  await client.views.publish(viewsPublishArguments);
+  await callWithRateLimitRetries(() => client.views.publish(viewsPublishArguments), rateLimitDeadline);
 }
 
-export async function postMessage(channelId: string, text:string, blocks: (KnownBlock | Block)[], thread_ts?: string) {
+export async function postMessage(channelId: string, text:string, blocks: (KnownBlock | Block)[], thread_ts?: string, rateLimitDeadline = Date.now() + DEFAULT_RATE_LIMIT_BUDGET_MS) {
   const client = await createClient();
-  await client.chat.postMessage({
+  await callWithRateLimitRetries(() => client.chat.postMessage({
     channel: channelId,
     text,
     blocks,
     thread_ts
-  });
+  }), rateLimitDeadline);
 }
 
-export async function postEphemeralMessage(channelId: string, userId: string, text:string, blocks: (KnownBlock | Block)[]) {
+export async function postEphemeralMessage(channelId: string, userId: string, text:string, blocks: (KnownBlock | Block)[], rateLimitDeadline = Date.now() + DEFAULT_RATE_LIMIT_BUDGET_MS) {
   const client = await createClient();
-  await client.chat.postEphemeral({
+  await callWithRateLimitRetries(() => client.chat.postEphemeral({
     user: userId,
     channel: channelId,
     text,
     blocks
-  });  
+  }), rateLimitDeadline);
 }
 
-export async function postEphmeralErrorMessage(channelId: string, userId:string, text: string) {
+export async function postEphmeralErrorMessage(channelId: string, userId:string, text: string, rateLimitDeadline?: number) {
   const blocks: KnownBlock[] = [
     {
       type: "section",
@@ -60,7 +161,7 @@ export async function postEphmeralErrorMessage(channelId: string, userId:string,
       }
     }
   ];
-  await postEphemeralMessage(channelId, userId, text, blocks);
+  await postEphemeralMessage(channelId, userId, text, blocks, rateLimitDeadline);
 }
 
 export async function postToResponseUrl(responseUrl: string, responseType: "ephemeral" | "in_channel", text: string, blocks: KnownBlock[]) {
@@ -69,10 +170,15 @@ export async function postToResponseUrl(responseUrl: string, responseType: "ephe
     text,
     blocks
   };
-  const result = await axios.post(responseUrl, messageBody);
+  const result = await postToSlackUrl(responseUrl, messageBody);
   return result;
 }
 
+export async function deleteOriginalMessage(responseUrl: string) {
+  // Use the POST api as per https://api.slack.com/interactivity/handling#deleting_message_response
+  await postToSlackUrl(responseUrl, {delete_original: "true"});
+}
+
 export async function postErrorMessageToResponseUrl(responseUrl: string, text: string) {
   const blocks: KnownBlock[] = [
     {
@@ -1,5 +1,5 @@
 
-import {DynamoDBClient, PutItemCommand, PutItemCommandInput, QueryCommand, QueryCommandInput, DeleteItemCommand, DeleteItemCommandInput} from '@aws-sdk/client-dynamodb';
+import {AttributeValue, DynamoDBClient, PutItemCommand, PutItemCommandInput, DeleteItemCommand, DeleteItemCommandInput} from '@aws-sdk/client-dynamodb';
 
 // The very useful TTL functionality in DynamoDB means we
 // can set a TTL on storing the refresh token.
@@ -9,72 +9,78 @@ import {DynamoDBClient, PutItemCommand, PutItemCommandInput, QueryCommand, Query
 const TTL_IN_MS = 1000 * 30; // 30 seconds
 const TableName = "AIBot_State";
 
+// Module scope so the client and its connection pool survive between warm invocations.
+const ddbClient = new DynamoDBClient({});
+
 export type State = {
   nonce: string,
   slack_user_id: string,
   verifier?: string
 };
 
-/**
- * Gets the state for the given nonce.
- * @param nonce 
- * @returns state or undefined if no state exists for the nonce
- */
-export async function getState(nonce: string) : Promise<State | undefined>  { 
-  const ddbClient = new DynamoDBClient({});
-
-  const params: QueryCommandInput = {
-    TableName,
-    KeyConditionExpression: "nonce = :nonce",
-    ExpressionAttributeValues: {
-      ":nonce" : {"S" : nonce}
-    }
+// State is stored as a native DynamoDB map rather than a JSON string,
+// which saves a stringify/parse on each side.
+function stateToAttributeValue(state: State): AttributeValue {
+  const map: Record<string, AttributeValue> = {
+    nonce: {S: state.nonce},
+    slack_user_id: {S: state.slack_user_id}
   };
-  const data = await ddbClient.send(new QueryCommand(params));
-  const items = data.Items;
-  if(items && items[0] && items[0].state.S) {
-    const state = JSON.parse(items[0].state.S) as State;
-    return state;
+  if(state.verifier) {
+    map.verifier = {S: state.verifier};
   }
-  else {
+  return {M: map};
+}
+
+function attributeValueToState(attributeValue?: AttributeValue): State | undefined {
+  const map = attributeValue?.M;
+  if(!map?.nonce?.S || !map.slack_user_id?.S) {
     return undefined;
   }
+  return {
+    nonce: map.nonce.S,
+    slack_user_id: map.slack_user_id.S,
+    verifier: map.verifier?.S
+  };
 }
 
-export async function deleteState(nonce: string) {
-  const ddbClient = new DynamoDBClient({});
-
+/**
+ * Deletes the state for the given nonce.
+ * The delete and the read of the old value happen in one atomic call,
+ * so the same nonce can't be used twice by concurrent requests.
+ * @param nonce 
+ * @returns the state that was deleted or undefined if no state existed for the nonce
+ */
+export async function deleteState(nonce: string) : Promise<State | undefined> {
   const params: DeleteItemCommandInput = {
     TableName,
     Key: {
       'nonce': {S: nonce}
-    }
+    },
+    ReturnValues: "ALL_OLD"
   };
 
   const command = new DeleteItemCommand(params);
 
-  await ddbClient.send(command);
+  const data = await ddbClient.send(command);
+  return attributeValueToState(data.Attributes?.state);
 }
 
 /**
  * Put (ie save new or overwite) state with nonce as the key
  * @param nonce Key for the table
- * @param state JSON value
+ * @param state State to save
  */
 export async function putState(nonce: string, state: State) {
-  const now = Date.now();
-  const ttl = new Date(now + TTL_IN_MS);
+  const expiry = Math.floor((Date.now() + TTL_IN_MS) / 1000);
 
   const putItemCommandInput: PutItemCommandInput = {
     TableName,
     Item: {
       nonce: {S: nonce},
-      state: {S: JSON.stringify(state)},
-      expiry: {N: `${Math.floor(ttl.getTime() / 1000)}`}
+      state: stateToAttributeValue(state),
+      expiry: {N: `${expiry}`}
     }
   };
 
-  const ddbClient = new DynamoDBClient({});
-
   await ddbClient.send(new PutItemCommand(putItemCommandInput));
 }
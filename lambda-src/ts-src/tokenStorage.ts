@@ -1,6 +1,10 @@
-import {DeleteItemCommand, DeleteItemCommandInput, DynamoDBClient, PutItemCommand, PutItemCommandInput, QueryCommand, QueryCommandInput} from '@aws-sdk/client-dynamodb';
+import {DeleteItemCommand, DeleteItemCommandInput, DynamoDBClient, GetItemCommand, GetItemCommandInput, PutItemCommand, PutItemCommandInput} from '@aws-sdk/client-dynamodb';
 
 const gcalTokenTableName = "AIBot_SlackIdToGCalToken";
+const TTL_IN_SECONDS = 60 * 60 * 24 * 7; // 7 days
+
+// Create the client once per Lambda container so warm invocations reuse its connections.
+const ddbClient = new DynamoDBClient({});
 
 export async function getGCalToken(slackUserId: string) {
   return await getToken(gcalTokenTableName, slackUserId);
@@ -15,19 +19,19 @@ export async function deleteGCalToken(slackUserId:string) {
 }
 
 async function getToken(tableName: string, slackUserId: string) {
-  const params: QueryCommandInput = {
+  // slack_id is the whole primary key so a GetItem is enough, and cheaper than a Query.
+  const params: GetItemCommandInput = {
     TableName: tableName,
-    KeyConditionExpression: "slack_id = :slack_id",
-    ExpressionAttributeValues: {
-      ":slack_id" : {"S" : slackUserId}
-    }
+    Key: {
+      slack_id: {S: slackUserId}
+    },
+    ProjectionExpression: "refresh_token"
   };
 
-  const ddbClient = new DynamoDBClient({});
-  const data = await ddbClient.send(new QueryCommand(params));
-  const items = data.Items;
-  if(items && items[0] && items[0].refresh_token.S) {
-    return items[0].refresh_token.S;
+  const data = await ddbClient.send(new GetItemCommand(params));
+  const item = data.Item;
+  if(item && item.refresh_token.S) {
+    return item.refresh_token.S;
   }
   else {
     return undefined;
@@ -40,19 +44,17 @@ async function saveToken(tableName: string, token:string, slackUserId:string) {
   // DynamoDB will automatically delete the token in
   // 7 days from now, so then the user will have to re-authenticate.
   // This is good security and also keeps down storage costs.
-  const ttl = new Date(Date.now());
-  ttl.setDate(ttl.getDate() + 7);
+  const ttl = Math.floor(Date.now() / 1000) + TTL_IN_SECONDS;
 
   const putItemCommandInput: PutItemCommandInput = {
     TableName: tableName,
     Item: {
       slack_id: {S: slackUserId},
       refresh_token: {S: token},
-      ttl: {N: `${Math.floor(ttl.getTime() / 1000)}`}
+      ttl: {N: `${ttl}`}
     }
   };
 
-  const ddbClient = new DynamoDBClient({});
   await ddbClient.send(new PutItemCommand(putItemCommandInput));
 }
 
@@ -64,6 +66,5 @@ async function deleteToken(tableName: string, slackUserId:string) {
     }
   };
 
-  const ddbClient = new DynamoDBClient({});
   await ddbClient.send(new DeleteItemCommand(deleteItemCommandInput));
 }
\ No newline at end of file